@@ -4,13 +4,23 @@ Handles JWT token generation/validation and role-based access control (RBAC).
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, VerificationError, InvalidHashError
+from sqlalchemy.ext.asyncio import AsyncSession
+from cachetools import TTLCache
+import anyio
+import anyio.to_thread
+import hashlib
+import hmac
+import logging
 import os
+import ssl
+import threading
+import time
 from dotenv import load_dotenv
 
 from app.db import get_db
@@ -18,30 +28,141 @@ from app.models import User, UserRole, UserStatus
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me-in-production")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
 
-# Password hashing with Argon2
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Preconstructed key bytes so each encode/decode skips per-call key handling
+_JWT_KEY = JWT_SECRET_KEY.encode()
+
+# Password hashing with Argon2 (direct argon2-cffi, no passlib dispatch layer)
+_password_hasher = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=4)
+
+# Argon2 is CPU-hard by design; cap concurrent hashing threads at the core
+# count so bursts of logins can't spawn unbounded workers.
+_hashing_limiter = anyio.CapacityLimiter(os.cpu_count() or 4)
+
+# Hash of a throwaway password, verified when a login names an unknown email
+# so response timing doesn't reveal which addresses are registered
+_DUMMY_PASSWORD_HASH = _password_hasher.hash("sapine-timing-dummy")
+
+# Recent verification outcomes. Argon2 runs ~100ms per check; bursty
+# retries from the same client (mobile apps, dashboards re-authing) hit
+# the cache instead of re-deriving the hash. Keys are HMACs of the
+# identifier and password under a per-process random secret, so a leaked
+# cache snapshot gives an attacker nothing to run offline guesses against.
+_verify_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_verify_cache_lock = threading.Lock()
+_VERIFY_CACHE_SECRET = os.urandom(32)
+
+
+def _verify_cache_key(identifier: str, plain_password: str) -> bytes:
+    """Keyed digest for the verify cache; see _VERIFY_CACHE_SECRET above."""
+    return hmac.new(
+        _VERIFY_CACHE_SECRET,
+        identifier.encode() + b"\x00" + plain_password.encode(),
+        hashlib.sha256,
+    ).digest()
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
 
+# Cache of recently validated tokens so repeated requests with the same bearer
+# token skip the HMAC verification and JSON parse. Keyed by a BLAKE2b digest of
+# the raw token so the token string itself never lives in a long-lived dict.
+_TOKEN_CACHE_MAX = 4096
+_token_cache: Dict[bytes, Tuple[float, dict]] = {}  # digest -> (exp, payload)
+_token_cache_lock = threading.Lock()
+
+
+def check_crypto_backend():
+    """
+    Sanity-check that HMAC-SHA256 (the HS256 hot path) is served by an
+    OpenSSL 3.x build, which selects the SHA-NI/SIMD code path on x86.
+    Logs a warning instead of failing so older environments keep working.
+    """
+    if hashlib.sha256().name != "sha256":
+        logger.warning("hashlib.sha256 is not the expected implementation")
+    if ssl.OPENSSL_VERSION_INFO < (3, 0):
+        logger.warning(
+            f"OpenSSL {ssl.OPENSSL_VERSION} predates 3.x; "
+            "HMAC-SHA256 may not use hardware-accelerated SHA-256"
+        )
+
 
 def hash_password(password: str) -> str:
     """
     Hash a password using Argon2.
     """
-    return pwd_context.hash(password)
+    return _password_hasher.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a password against its hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerifyMismatchError, VerificationError, InvalidHashError):
+        return False
+
+
+async def ahash_password(password: str) -> str:
+    """
+    Hash a password on a worker thread so the event loop stays free.
+    """
+    return await anyio.to_thread.run_sync(
+        hash_password, password, limiter=_hashing_limiter
+    )
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on a worker thread so the event loop stays free.
+    """
+    return await anyio.to_thread.run_sync(
+        verify_password, plain_password, hashed_password, limiter=_hashing_limiter
+    )
+
+
+async def averify_password_cached(
+    user_id: int, plain_password: str, hashed_password: str
+) -> bool:
+    """
+    Verify a password, amortizing the Argon2 cost across rapid retries.
+    The cache stores only the boolean outcome under a keyed digest; the
+    password and its Argon2 hash never enter the cache.
+    """
+    key = _verify_cache_key(f"user:{user_id}", plain_password)
+    with _verify_cache_lock:
+        cached = _verify_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await averify_password(plain_password, hashed_password)
+    with _verify_cache_lock:
+        _verify_cache[key] = result
+    return result
+
+
+async def adummy_verify(email: str, plain_password: str) -> None:
+    """
+    Burn one Argon2 verification against a throwaway hash, fronted by the
+    same cache as real verifications. Called on logins for unknown emails:
+    with the cache in front, a repeated attempt for an unknown address
+    returns as fast as a repeated attempt for a known one, so neither the
+    slow nor the fast path reveals whether the email is registered.
+    """
+    key = _verify_cache_key(f"unknown:{email}", plain_password)
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            return
+    await averify_password(plain_password, _DUMMY_PASSWORD_HASH)
+    with _verify_cache_lock:
+        _verify_cache[key] = False
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -55,29 +176,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
 def decode_token(token: str) -> dict:
     """
     Decode and validate a JWT token.
+    Validated payloads are cached until their `exp` passes, so the hot auth
+    path only pays the signature check once per token per process.
     Raises HTTPException if token is invalid or expired.
     """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+        if cached is not None:
+            exp, payload = cached
+            if exp > now:
+                return dict(payload)
+            del _token_cache[cache_key]
+
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
-    except JWTError:
+        payload = jwt.decode(
+            token, _JWT_KEY, algorithms=[JWT_ALGORITHM],
+            options={"require": ["exp", "sub"]}
+        )
+    except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    exp = payload.get("exp")
+    if exp is not None:
+        with _token_cache_lock:
+            if len(_token_cache) >= _TOKEN_CACHE_MAX:
+                # Evict the oldest entry (dicts preserve insertion order)
+                _token_cache.pop(next(iter(_token_cache)))
+            _token_cache[cache_key] = (exp, payload)
+
+    return dict(payload)
+
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Get the current authenticated user from JWT token.
@@ -101,7 +247,8 @@ def get_current_user(
             detail="Invalid user ID in token"
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    # Session.get() is the identity-map-aware primary-key fast path
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -3,16 +3,25 @@ Bot management endpoints and business logic.
 Handles bot CRUD operations, file uploads, and lifecycle management.
 """
 
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import os
+import re
 import shutil
+import threading
+import time
 import zipfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
-from app.db import get_db
+from app.db import get_db, AsyncSessionLocal
 from app.models import User, Bot, BotStatus, BotRuntime, SourceType, Plan, AuditLog
 from app.auth import get_current_user
 from app.docker import (
@@ -46,7 +55,7 @@ class BotResponse(BaseModel):
     status: BotStatus
     start_cmd: Optional[str]
     source_type: Optional[SourceType]
-    created_at: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
@@ -57,13 +66,51 @@ class BotListResponse(BaseModel):
     total: int
 
 
-def verify_bot_ownership(bot_id: int, user_id: int, db: Session) -> Bot:
+# Copy buffer for upload writes; the 16 KiB copyfileobj default costs
+# thousands of extra syscalls on large archives
+_COPY_CHUNK = 1 << 20  # 1 MiB
+
+# Zip-bomb defense: cap on cumulative decompressed size per upload
+MAX_EXTRACTED_SIZE = int(os.getenv("MAX_EXTRACTED_SIZE", str(512 * 1024 * 1024)))
+
+# Absolute paths or ".." segments in zip member names (path traversal)
+_UNSAFE_ZIP_PATH = re.compile(r'(?:^|/)\.\.(?:/|$)|^/')
+
+
+def save_upload_to_disk(src, dest: Path) -> None:
+    """
+    Write an uploaded file object to disk using large chunks.
+    Uses os.sendfile (zero-copy) when the upload is already file-backed,
+    falling back to 1 MiB buffered copies for in-memory spools.
+    """
+    with open(dest, 'wb') as out:
+        try:
+            in_fd = src.fileno()
+        except (AttributeError, OSError, ValueError):
+            in_fd = None
+
+        if in_fd is not None:
+            try:
+                while os.sendfile(out.fileno(), in_fd, None, _COPY_CHUNK) > 0:
+                    pass
+                return
+            except OSError:
+                # macOS/BSD sendfile only targets sockets (ENOTSUP/EINVAL).
+                # Offsets advanced with whatever was copied, so the buffered
+                # fallback below resumes from where sendfile stopped.
+                pass
+        shutil.copyfileobj(src, out, length=_COPY_CHUNK)
+
+
+async def verify_bot_ownership(bot_id: int, user_id: int, db: AsyncSession) -> Bot:
     """
     Verify that a bot belongs to a user and return the bot.
     Raises NotFoundException if bot doesn't exist.
     Raises ForbiddenException if user doesn't own the bot.
     """
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    # Primary-key get() hits the identity map first, so repeat lookups within
+    # a request (ownership check + mutation) reuse the already-loaded row
+    bot = await db.get(Bot, bot_id)
     if not bot:
         raise NotFoundException("Bot not found")
     
@@ -73,8 +120,37 @@ def verify_bot_ownership(bot_id: int, user_id: int, db: Session) -> Bot:
     return bot
 
 
+# Plans change rarely but are read on every bot create/start; short-TTL
+# snapshots save the round-trip on the hot path
+_PLAN_CACHE_TTL = 30  # seconds
+_plan_cache: Dict[int, Tuple[float, Plan]] = {}
+
+
+async def get_plan_cached(db: AsyncSession, plan_id: int) -> Optional[Plan]:
+    """
+    Fetch a Plan by id with a short-TTL in-process cache.
+    Returns a detached snapshot; callers only read its limit columns.
+    """
+    cached = _plan_cache.get(plan_id)
+    if cached is not None and time.time() - cached[0] < _PLAN_CACHE_TTL:
+        return cached[1]
+
+    plan = await db.get(Plan, plan_id)
+    if plan is not None:
+        db.expunge(plan)
+        _plan_cache[plan_id] = (time.time(), plan)
+    return plan
+
+
+# Audit entries are queued (as plain dicts) and committed in batches by
+# audit_log_writer so mutating endpoints don't pay a second commit/fsync of
+# their own
+_audit_queue: "asyncio.Queue[dict]" = asyncio.Queue()
+_AUDIT_FLUSH_BATCH = 100
+_AUDIT_FLUSH_INTERVAL = 0.2  # seconds
+
+
 def create_audit_log(
-    db: Session,
     user_id: int,
     action: str,
     target_id: str,
@@ -82,17 +158,44 @@ def create_audit_log(
     details: Optional[str] = None
 ):
     """
-    Create an audit log entry for security-sensitive actions.
+    Queue an audit log entry for security-sensitive actions.
+    Entries are flushed in batches by the background writer task.
     """
-    audit = AuditLog(
-        user_id=user_id,
-        action=action,
-        target_id=target_id,
-        ip_address=ip_address,
-        details=details
-    )
-    db.add(audit)
-    db.commit()
+    _audit_queue.put_nowait({
+        "user_id": user_id,
+        "action": action,
+        "target_id": target_id,
+        "ip_address": ip_address,
+        "details": details
+    })
+
+
+async def audit_log_writer():
+    """
+    Background task that drains the audit queue.
+    Coalesces entries (up to _AUDIT_FLUSH_BATCH rows or _AUDIT_FLUSH_INTERVAL
+    seconds) into a single commit. Started from the application startup event.
+    """
+    while True:
+        batch = [await _audit_queue.get()]
+        deadline = time.monotonic() + _AUDIT_FLUSH_INTERVAL
+        while len(batch) < _AUDIT_FLUSH_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_audit_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            async with AsyncSessionLocal() as db:
+                # Core insert skips the unit-of-work machinery and hits the
+                # executemany fast path for write-only rows
+                await db.execute(insert(AuditLog), batch)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} audit log entries: {e}")
 
 
 @router.post("", response_model=BotResponse, status_code=status.HTTP_201_CREATED)
@@ -101,7 +204,7 @@ async def create_bot(
     bot_data: BotCreate,
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new bot instance.
@@ -124,27 +227,22 @@ async def create_bot(
             "Invalid start command. Command contains dangerous patterns."
         )
     
-    # Check plan exists
-    plan = db.query(Plan).filter(Plan.id == bot_data.plan_id).first()
+    # Check plan exists (cached snapshot; plans change rarely)
+    plan = await get_plan_cached(db, bot_data.plan_id)
     if not plan:
         raise NotFoundException("Plan not found")
-    
+
     # Check user hasn't exceeded bot limit
-    user_bot_count = db.query(Bot).filter(Bot.user_id == current_user.id).count()
+    user_bot_count = await db.scalar(
+        select(func.count(Bot.id)).where(Bot.user_id == current_user.id)
+    )
     if user_bot_count >= plan.max_bots:
         raise ConflictException(
             f"Bot limit reached. Your plan allows maximum {plan.max_bots} bots."
         )
-    
-    # Check for duplicate bot name (per user)
-    existing = db.query(Bot).filter(
-        Bot.user_id == current_user.id,
-        Bot.name == bot_data.name
-    ).first()
-    if existing:
-        raise ConflictException("A bot with this name already exists")
-    
-    # Create bot record
+
+    # Create bot record; the unique (user_id, name) index handles duplicate
+    # names without a separate pre-check round-trip (and without a TOCTOU race)
     bot = Bot(
         user_id=current_user.id,
         plan_id=bot_data.plan_id,
@@ -154,58 +252,129 @@ async def create_bot(
         status=BotStatus.CREATED
     )
     db.add(bot)
-    db.commit()
-    db.refresh(bot)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise ConflictException("A bot with this name already exists")
+    await db.refresh(bot)
     
     # Create storage directory
     get_bot_storage_path(bot.id)
     
     # Audit log
     create_audit_log(
-        db, current_user.id, "bot_create", str(bot.id),
+        current_user.id, "bot_create", str(bot.id),
         get_client_ip(request)
     )
     
     logger.info(f"User {current_user.id} created bot {bot.id}")
     
-    return BotResponse(
-        id=bot.id,
-        name=bot.name,
-        runtime=bot.runtime,
-        status=bot.status,
-        start_cmd=bot.start_cmd,
-        source_type=bot.source_type,
-        created_at=bot.created_at.isoformat()
-    )
+    return BotResponse.model_validate(bot)
 
 
 @router.get("", response_model=BotListResponse)
 async def list_bots(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all bots owned by the current user.
     """
-    bots = db.query(Bot).filter(Bot.user_id == current_user.id).all()
+    result = await db.execute(select(Bot).where(Bot.user_id == current_user.id))
+    bots = result.scalars().all()
     
     return BotListResponse(
         bots=[
-            BotResponse(
-                id=bot.id,
-                name=bot.name,
-                runtime=bot.runtime,
-                status=bot.status,
-                start_cmd=bot.start_cmd,
-                source_type=bot.source_type,
-                created_at=bot.created_at.isoformat()
-            )
+            BotResponse.model_validate(bot)
             for bot in bots
         ],
         total=len(bots)
     )
 
 
+# Archives with at least this many files are extracted in parallel
+_PARALLEL_EXTRACT_MIN = 64
+
+
+def _extract_member(zip_ref: zipfile.ZipFile, member: str, target: str) -> None:
+    """Stream-decompress one zip member to its destination via a raw fd."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        with zip_ref.open(member) as src:
+            while chunk := src.read(_COPY_CHUNK):
+                os.write(fd, chunk)
+    finally:
+        os.close(fd)
+
+
+def _extract_zip(zip_path: Path, bot_path_str: str, allowed_extensions, runtime) -> None:
+    """
+    Validate and extract an uploaded zip in a single pass over the central
+    directory. Raises BadRequestException on traversal attempts, disallowed
+    extensions, or zip-bomb-sized contents.
+
+    Large archives are extracted across a thread pool: zlib releases the GIL
+    while inflating, so decompression parallelizes across cores.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        extracted_bytes = 0
+        jobs = []
+        for info in zip_ref.infolist():
+            member = info.filename
+
+            # Security: Prevent path traversal (one regex scan, no Path
+            # allocation per member)
+            if _UNSAFE_ZIP_PATH.search(member):
+                raise BadRequestException("Invalid file path in zip")
+
+            if info.is_dir():
+                continue
+
+            # Check file extension
+            ext = os.path.splitext(member)[1]
+            if ext and ext not in allowed_extensions:
+                raise BadRequestException(
+                    f"File type {ext} not allowed for {runtime} runtime"
+                )
+
+            # Security: Cap cumulative decompressed size (zip bombs)
+            extracted_bytes += info.file_size
+            if extracted_bytes > MAX_EXTRACTED_SIZE:
+                raise BadRequestException(
+                    "Zip contents exceed the maximum allowed size"
+                )
+
+            # Resolve the target once and belt-and-braces check it stays
+            # inside the bot directory
+            target = os.path.normpath(os.path.join(bot_path_str, member))
+            if not target.startswith(bot_path_str + os.sep):
+                raise BadRequestException("Invalid file path in zip")
+
+            jobs.append((member, target))
+
+        if len(jobs) < _PARALLEL_EXTRACT_MIN:
+            for member, target in jobs:
+                _extract_member(zip_ref, member, target)
+            return
+
+    # ZipFile readers aren't thread-safe, so each worker opens its own
+    # handle over the already-validated archive
+    local = threading.local()
+
+    def extract_with_local_reader(job):
+        reader = getattr(local, "reader", None)
+        if reader is None:
+            reader = local.reader = zipfile.ZipFile(zip_path, 'r')
+        _extract_member(reader, *job)
+
+    workers = min(os.cpu_count() or 1, 8)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # list() drains the iterator so worker exceptions propagate
+        list(pool.map(extract_with_local_reader, jobs))
+
+
 @router.post("/{bot_id}/upload", status_code=status.HTTP_200_OK)
 @rate_limit(requests_per_minute=5)
 async def upload_bot_files(
@@ -213,7 +382,7 @@ async def upload_bot_files(
     request: Request,
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Upload bot source code (zip or single file).
@@ -224,17 +393,24 @@ async def upload_bot_files(
     - Extracts files safely
     - Never executes uploaded code on host
     """
-    bot = verify_bot_ownership(bot_id, current_user.id, db)
+    bot = await verify_bot_ownership(bot_id, current_user.id, db)
     runtime_config = get_runtime_config(bot.runtime)
+    allowed_extensions = runtime_config["allowed_extensions"]  # frozenset, O(1) lookup
     bot_path = get_bot_storage_path(bot_id)
     
-    # Clean existing files (except keep .gitkeep if exists)
-    for item in bot_path.glob("*"):
-        if item.name != ".gitkeep":
-            if item.is_file():
-                item.unlink()
-            elif item.is_dir():
-                shutil.rmtree(item)
+    # Clean existing files without replacing the directory itself: a
+    # running container bind-mounts this path, and recreating the inode
+    # would leave the mount pointing at the deleted directory until the
+    # container restarts. Subtrees still go through the C-level rmtree;
+    # only top-level entries cost a Python-side call each. The .gitkeep
+    # marker some deployments rely on is preserved in place.
+    for entry in os.scandir(bot_path):
+        if entry.name == ".gitkeep":
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        else:
+            os.unlink(entry.path)
     
     filename = sanitize_filename(file.filename or "upload")
     
@@ -242,60 +418,45 @@ async def upload_bot_files(
     if filename.endswith('.zip'):
         zip_path = bot_path / filename
         
-        # Save zip file
-        with open(zip_path, 'wb') as f:
-            shutil.copyfileobj(file.file, f)
-        
-        # Extract safely
+        # Save zip file, then release the spooled upload buffer so we don't
+        # hold both the spool and the on-disk copy through extraction
+        save_upload_to_disk(file.file, zip_path)
+        file.file.close()
+
+        # Validation and extraction are blocking, CPU-bound work; run the
+        # whole pass on a worker thread so the event loop stays free
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Security: Check for path traversal in zip
-                for member in zip_ref.namelist():
-                    # Prevent path traversal
-                    member_path = Path(member)
-                    if member_path.is_absolute() or ".." in member_path.parts:
-                        raise BadRequestException("Invalid file path in zip")
-                    
-                    # Check file extension
-                    if member.endswith('/'):  # Directory
-                        continue
-                    
-                    ext = Path(member).suffix
-                    if ext and ext not in runtime_config["allowed_extensions"]:
-                        raise BadRequestException(
-                            f"File type {ext} not allowed for {bot.runtime} runtime"
-                        )
-                
-                # Extract all files
-                zip_ref.extractall(bot_path)
-            
+            await asyncio.to_thread(
+                _extract_zip, zip_path, str(bot_path), allowed_extensions, bot.runtime
+            )
+
             # Remove zip file after extraction
             zip_path.unlink()
-            
+
             bot.source_type = SourceType.ZIP
-            
+
         except zipfile.BadZipFile:
             raise BadRequestException("Invalid zip file")
         
     else:
         # Handle single file upload
         ext = Path(filename).suffix
-        if ext not in runtime_config["allowed_extensions"]:
+        if ext not in allowed_extensions:
             raise BadRequestException(
                 f"File type {ext} not allowed for {bot.runtime} runtime"
             )
         
         file_path = bot_path / filename
-        with open(file_path, 'wb') as f:
-            shutil.copyfileobj(file.file, f)
-        
+        save_upload_to_disk(file.file, file_path)
+        file.file.close()
+
         bot.source_type = SourceType.FILE
     
-    db.commit()
+    await db.commit()
     
     # Audit log
     create_audit_log(
-        db, current_user.id, "bot_upload", str(bot_id),
+        current_user.id, "bot_upload", str(bot_id),
         get_client_ip(request), f"Uploaded {filename}"
     )
     
@@ -310,7 +471,7 @@ async def start_bot(
     bot_id: int,
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Start a bot's container.
@@ -318,10 +479,10 @@ async def start_bot(
     Creates container if it doesn't exist, then starts it.
     Updates bot status in database.
     """
-    bot = verify_bot_ownership(bot_id, current_user.id, db)
+    bot = await verify_bot_ownership(bot_id, current_user.id, db)
     
-    # Get plan for resource limits
-    plan = db.query(Plan).filter(Plan.id == bot.plan_id).first()
+    # Get plan for resource limits (cached snapshot)
+    plan = await get_plan_cached(db, bot.plan_id)
     if not plan:
         raise NotFoundException("Plan not found")
     
@@ -333,7 +494,10 @@ async def start_bot(
     try:
         # Create container if doesn't exist
         if not bot.container_id:
-            container_id = create_container(
+            # Docker SDK calls block on the unix socket; run them on worker
+            # threads so the event loop keeps serving other requests
+            container_id = await asyncio.to_thread(
+                create_container,
                 bot_id=bot.id,
                 runtime=bot.runtime,
                 start_cmd=bot.start_cmd,
@@ -341,20 +505,20 @@ async def start_bot(
                 ram_limit=plan.ram_limit
             )
             bot.container_id = container_id
-            db.commit()
+            await db.commit()
         
         # Start container
-        success = start_container(bot.container_id)
+        success = await asyncio.to_thread(start_container, bot.container_id)
         if not success:
             raise BadRequestException("Failed to start container")
         
         # Update status
         bot.status = BotStatus.RUNNING
-        db.commit()
+        await db.commit()
         
         # Audit log
         create_audit_log(
-            db, current_user.id, "bot_start", str(bot_id),
+            current_user.id, "bot_start", str(bot_id),
             get_client_ip(request)
         )
         
@@ -362,18 +526,10 @@ async def start_bot(
         
     except Exception as e:
         bot.status = BotStatus.CRASHED
-        db.commit()
+        await db.commit()
         raise BadRequestException(f"Failed to start bot: {str(e)}")
     
-    return BotResponse(
-        id=bot.id,
-        name=bot.name,
-        runtime=bot.runtime,
-        status=bot.status,
-        start_cmd=bot.start_cmd,
-        source_type=bot.source_type,
-        created_at=bot.created_at.isoformat()
-    )
+    return BotResponse.model_validate(bot)
 
 
 @router.post("/{bot_id}/stop", response_model=BotResponse)
@@ -382,40 +538,32 @@ async def stop_bot(
     bot_id: int,
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Stop a bot's container.
     """
-    bot = verify_bot_ownership(bot_id, current_user.id, db)
+    bot = await verify_bot_ownership(bot_id, current_user.id, db)
     
     if not bot.container_id:
         raise BadRequestException("Bot has no container")
     
-    success = stop_container(bot.container_id)
+    success = await asyncio.to_thread(stop_container, bot.container_id)
     if not success:
         raise BadRequestException("Failed to stop container")
     
     bot.status = BotStatus.STOPPED
-    db.commit()
+    await db.commit()
     
     # Audit log
     create_audit_log(
-        db, current_user.id, "bot_stop", str(bot_id),
+        current_user.id, "bot_stop", str(bot_id),
         get_client_ip(request)
     )
     
     logger.info(f"User {current_user.id} stopped bot {bot_id}")
     
-    return BotResponse(
-        id=bot.id,
-        name=bot.name,
-        runtime=bot.runtime,
-        status=bot.status,
-        start_cmd=bot.start_cmd,
-        source_type=bot.source_type,
-        created_at=bot.created_at.isoformat()
-    )
+    return BotResponse.model_validate(bot)
 
 
 @router.post("/{bot_id}/restart", response_model=BotResponse)
@@ -424,40 +572,32 @@ async def restart_bot(
     bot_id: int,
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Restart a bot's container.
     """
-    bot = verify_bot_ownership(bot_id, current_user.id, db)
+    bot = await verify_bot_ownership(bot_id, current_user.id, db)
     
     if not bot.container_id:
         raise BadRequestException("Bot has no container")
     
-    success = restart_container(bot.container_id)
+    success = await asyncio.to_thread(restart_container, bot.container_id)
     if not success:
         raise BadRequestException("Failed to restart container")
     
     bot.status = BotStatus.RUNNING
-    db.commit()
+    await db.commit()
     
     # Audit log
     create_audit_log(
-        db, current_user.id, "bot_restart", str(bot_id),
+        current_user.id, "bot_restart", str(bot_id),
         get_client_ip(request)
     )
     
     logger.info(f"User {current_user.id} restarted bot {bot_id}")
     
-    return BotResponse(
-        id=bot.id,
-        name=bot.name,
-        runtime=bot.runtime,
-        status=bot.status,
-        start_cmd=bot.start_cmd,
-        source_type=bot.source_type,
-        created_at=bot.created_at.isoformat()
-    )
+    return BotResponse.model_validate(bot)
 
 
 @router.delete("/{bot_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -466,29 +606,32 @@ async def delete_bot(
     bot_id: int,
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a bot and its container.
     """
-    bot = verify_bot_ownership(bot_id, current_user.id, db)
+    bot = await verify_bot_ownership(bot_id, current_user.id, db)
     
     # Remove container if exists
     if bot.container_id:
-        remove_container(bot.container_id, force=True)
+        await asyncio.to_thread(remove_container, bot.container_id, force=True)
     
     # Remove bot files
     bot_path = get_bot_storage_path(bot_id)
     if bot_path.exists():
-        shutil.rmtree(bot_path)
+        await asyncio.to_thread(shutil.rmtree, bot_path)
+    # The cached path entry claims the directory exists; drop it so a
+    # recreated bot id gets a fresh mkdir
+    get_bot_storage_path.cache_clear()
     
     # Delete from database
-    db.delete(bot)
-    db.commit()
+    await db.delete(bot)
+    await db.commit()
     
     # Audit log
     create_audit_log(
-        db, current_user.id, "bot_delete", str(bot_id),
+        current_user.id, "bot_delete", str(bot_id),
         get_client_ip(request)
     )
     
@@ -9,7 +9,11 @@ Never expose Docker client or container objects directly to users.
 import docker
 from docker.errors import DockerException, NotFound, APIError
 from typing import Optional, Dict, Generator
+import functools
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import threading
 from pathlib import Path
 import logging
 
@@ -21,6 +25,12 @@ logger = logging.getLogger(__name__)
 # Docker client singleton
 _docker_client: Optional[docker.DockerClient] = None
 
+# Images confirmed present on the local daemon. The registry only ships a
+# couple of images and they change rarely, so after warm-up repeat bot
+# creations skip the inspect round-trip entirely.
+_images_present: set = set()
+_images_present_lock = threading.Lock()
+
 
 def get_docker_client() -> docker.DockerClient:
     """
@@ -61,31 +71,52 @@ RUNTIME_REGISTRY: Dict[BotRuntime, Dict] = {
         "build_cmd": "pip install --no-cache-dir -r requirements.txt",
         "default_start": "python main.py",
         "working_dir": "/app",
-        "allowed_extensions": [".py", ".txt", ".json", ".yaml", ".yml"],
+        "allowed_extensions": frozenset({".py", ".txt", ".json", ".yaml", ".yml"}),
     },
     BotRuntime.NODE: {
         "image": "node:20-alpine",
         "build_cmd": "npm install",
         "default_start": "node index.js",
         "working_dir": "/app",
-        "allowed_extensions": [".js", ".json", ".ts"],
+        "allowed_extensions": frozenset({".js", ".json", ".ts"}),
     },
 }
 
 
+# Invariant container kwargs shared by every bot: no privileged mode, all
+# capabilities dropped, no privilege escalation, bridge-only networking, and
+# explicit lifecycle management. Built once so create_container only fills
+# in per-bot values.
+_CONTAINER_DEFAULTS: Dict = {
+    "detach": True,
+    "privileged": False,
+    "cap_drop": ["ALL"],
+    "security_opt": ["no-new-privileges"],
+    "network_mode": "bridge",
+    "read_only": False,  # Writable /tmp is needed for build steps
+    "auto_remove": False,  # We manage cleanup explicitly
+    "cpu_period": 100000,
+}
+
+
+@functools.lru_cache(maxsize=16)
 def get_runtime_config(runtime: BotRuntime) -> Dict:
     """
     Get configuration for a specific runtime.
+    Cached per runtime; the registry is immutable at runtime.
     """
     if runtime not in RUNTIME_REGISTRY:
         raise BadRequestException(f"Unsupported runtime: {runtime}")
     return RUNTIME_REGISTRY[runtime]
 
 
+@functools.lru_cache(maxsize=1024)
 def get_bot_storage_path(bot_id: int) -> Path:
     """
     Get the storage path for a bot's files.
-    Creates directory if it doesn't exist.
+    Creates directory if it doesn't exist (first call per bot only; cached
+    calls skip the mkdir/stat entirely — callers that delete the directory
+    must invalidate with get_bot_storage_path.cache_clear()).
     
     Returns an absolute path to ensure Docker treats it as a bind mount
     rather than a named volume.
@@ -98,6 +129,143 @@ def get_bot_storage_path(bot_id: int) -> Path:
     return bot_path
 
 
+def prepull_runtime_images() -> None:
+    """
+    Pull every registry image and mark it present.
+    Run in the background at startup so the first bot creation per runtime
+    pays container-create latency, not image-pull latency.
+    """
+    try:
+        client = get_docker_client()
+    except RuntimeError as e:
+        logger.warning(f"Skipping image pre-pull, Docker unavailable: {e}")
+        return
+
+    images = {cfg["image"] for cfg in RUNTIME_REGISTRY.values()}
+
+    def _pull(image: str) -> None:
+        try:
+            try:
+                client.images.get(image)
+            except NotFound:
+                logger.info(f"Pre-pulling image {image}")
+                client.images.pull(image)
+            with _images_present_lock:
+                _images_present.add(image)
+        except (APIError, DockerException) as e:
+            logger.warning(f"Failed to pre-pull image {image}: {e}")
+
+    with ThreadPoolExecutor(max_workers=len(images)) as pool:
+        list(pool.map(_pull, images))
+
+
+def _bulk_map(fn, container_ids) -> Dict[str, object]:
+    """
+    Apply a per-container helper across many ids on a thread pool.
+    The Docker SDK blocks in socket I/O (where the GIL is released), so N
+    independent ops complete in roughly the wall time of the slowest one.
+    """
+    ids = list(container_ids)
+    if not ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(32, len(ids))) as pool:
+        return dict(zip(ids, pool.map(fn, ids)))
+
+
+def bulk_start(container_ids) -> Dict[str, bool]:
+    """Start many containers in parallel. Returns {container_id: success}."""
+    return _bulk_map(start_container, container_ids)
+
+
+def bulk_stop(container_ids) -> Dict[str, bool]:
+    """Stop many containers in parallel. Returns {container_id: success}."""
+    return _bulk_map(stop_container, container_ids)
+
+
+def bulk_get_status(container_ids) -> Dict[str, BotStatus]:
+    """Status-check many containers in parallel. Returns {container_id: status}."""
+    return _bulk_map(get_container_status, container_ids)
+
+
+# Label filter scoping every list call to our own containers; keeps dockerd
+# from scanning unrelated containers on shared hosts
+_MANAGED_FILTER = {"label": "managed_by=sapine-bots"}
+
+# Exit code embedded in the human-readable Status column of /containers/json
+_EXITED_CODE_RE = re.compile(r"Exited \((\d+)\)")
+
+
+def poll_statuses(container_ids) -> Dict[str, BotStatus]:
+    """
+    Resolve statuses for many containers with one low-level /containers/json
+    call instead of a full inspect per container.
+
+    The list endpoint already carries the state and (inside the Status text)
+    the exit code, so polling loops parse a few hundred bytes per container
+    rather than the full inspect document. Containers that no longer exist
+    map to STOPPED.
+    """
+    wanted = set(container_ids)
+    if not wanted:
+        return {}
+
+    client = get_docker_client()
+    try:
+        rows = client.api.containers(all=True, filters=_MANAGED_FILTER)
+    except APIError as e:
+        logger.error(f"Failed to poll container statuses: {e}")
+        return {}
+
+    statuses = {cid: BotStatus.STOPPED for cid in wanted}
+    for row in rows:
+        cid = row.get("Id")
+        if cid not in wanted:
+            continue
+        state = (row.get("State") or "").lower()
+        if state == "running":
+            statuses[cid] = BotStatus.RUNNING
+        elif state in ("exited", "dead"):
+            match = _EXITED_CODE_RE.search(row.get("Status") or "")
+            if match and match.group(1) != "0":
+                statuses[cid] = BotStatus.CRASHED
+        elif state == "created":
+            statuses[cid] = BotStatus.CREATED
+    return statuses
+
+
+def list_managed_containers() -> list:
+    """
+    List every container this platform manages, in one API call.
+
+    Always filters on the managed_by label so dockerd only walks our
+    containers, not everything else on a shared host. Any bulk or dashboard
+    code path must go through this (or pass the same filter) rather than an
+    unfiltered containers.list().
+    """
+    client = get_docker_client()
+    try:
+        return client.containers.list(all=True, filters=_MANAGED_FILTER)
+    except APIError as e:
+        logger.error(f"Failed to list managed containers: {e}")
+        return []
+
+
+def get_containers_by_ids(container_ids) -> Dict[str, "docker.models.containers.Container"]:
+    """
+    Fetch several managed containers with a single /containers/json call.
+
+    Bulk callers (status refresh, admin views) should use this instead of N
+    containers.get() lookups — one round-trip to dockerd instead of one per
+    container. Containers that no longer exist are simply absent from the
+    returned dict.
+    """
+    wanted = set(container_ids)
+    if not wanted:
+        return {}
+
+    return {c.id: c for c in list_managed_containers() if c.id in wanted}
+
+
 def create_container(
     bot_id: int,
     runtime: BotRuntime,
@@ -127,34 +295,25 @@ def create_container(
         start_cmd = runtime_config["default_start"]
     
     container_name = f"bot-{bot_id}"
-    
-    # Security: Drop ALL capabilities
-    cap_drop = ["ALL"]
-    
-    # Security: No privileged mode
-    privileged = False
-    
-    # Security: Resource limits
-    mem_limit = ram_limit
-    # CPU limit is provided as a decimal string (e.g., "0.5" for 50% of one CPU)
-    # Convert to CPU quota: cpu_quota = cpu_limit * cpu_period
-    cpu_period = 100000
-    cpu_quota = int(float(cpu_limit) * cpu_period)
-    
+    image = runtime_config["image"]
+
     try:
-        # Pull image if not available
-        try:
-            client.images.get(runtime_config["image"])
-        except NotFound:
-            logger.info(f"Pulling image {runtime_config['image']}")
-            client.images.pull(runtime_config["image"])
+        # Pull image if not available (cached after the first confirmation)
+        if image not in _images_present:
+            try:
+                client.images.get(image)
+            except NotFound:
+                logger.info(f"Pulling image {image}")
+                client.images.pull(image)
+            with _images_present_lock:
+                _images_present.add(image)
         
-        # Create container with security constraints
+        # Create container: invariant security settings come from the shared
+        # template, only per-bot values are computed here
         container = client.containers.create(
-            image=runtime_config["image"],
+            image=image,
             name=container_name,
             command=["sh", "-c", f"{runtime_config['build_cmd']} 2>&1 || true && {start_cmd}"],
-            detach=True,
             
             # Mount user code (read-only mount, writable /tmp for build artifacts)
             volumes={
@@ -165,25 +324,11 @@ def create_container(
             },
             working_dir=runtime_config["working_dir"],
             
-            # Security: No privileged mode
-            privileged=privileged,
-            
-            # Security: Drop all capabilities
-            cap_drop=cap_drop,
-            
             # Security: Resource limits
-            mem_limit=mem_limit,
-            cpu_quota=cpu_quota,
-            cpu_period=cpu_period,
-            
-            # Security: Network isolation (no host network)
-            network_mode="bridge",
-            
-            # Security: Read-only root filesystem
-            read_only=False,  # We need writable /tmp for build steps
-            
-            # Security: No privilege escalation
-            security_opt=["no-new-privileges"],
+            mem_limit=ram_limit,
+            # CPU limit is a decimal string (e.g., "0.5" for 50% of one CPU);
+            # quota = limit * period
+            cpu_quota=int(float(cpu_limit) * _CONTAINER_DEFAULTS["cpu_period"]),
             
             # Logging
             labels={
@@ -191,8 +336,7 @@ def create_container(
                 "managed_by": "sapine-bots"
             },
             
-            # Auto-remove on stop (cleanup)
-            auto_remove=False,  # We manage cleanup explicitly
+            **_CONTAINER_DEFAULTS,
         )
         
         logger.info(f"Created container {container.id} for bot {bot_id}")
@@ -260,6 +404,16 @@ def remove_container(container_id: str, force: bool = False) -> bool:
         return False
 
 
+# Docker state string -> BotStatus; anything unknown maps to STOPPED
+_STATUS_MAP = {
+    "running": BotStatus.RUNNING,
+    "created": BotStatus.CREATED,
+    "exited": BotStatus.STOPPED,
+    "dead": BotStatus.STOPPED,
+    "paused": BotStatus.STOPPED,
+}
+
+
 def get_container_status(container_id: str) -> BotStatus:
     """
     Get the current status of a container.
@@ -270,18 +424,12 @@ def get_container_status(container_id: str) -> BotStatus:
         container = client.containers.get(container_id)
         docker_status = container.status.lower()
         
-        if docker_status == "running":
-            return BotStatus.RUNNING
-        elif docker_status in ["exited", "dead"]:
+        if docker_status in ("exited", "dead"):
             # Check exit code to determine if crashed
             exit_code = container.attrs.get("State", {}).get("ExitCode", 0)
             if exit_code != 0:
                 return BotStatus.CRASHED
-            return BotStatus.STOPPED
-        elif docker_status == "created":
-            return BotStatus.CREATED
-        else:
-            return BotStatus.STOPPED
+        return _STATUS_MAP.get(docker_status, BotStatus.STOPPED)
             
     except NotFound:
         return BotStatus.STOPPED
@@ -290,24 +438,44 @@ def get_container_status(container_id: str) -> BotStatus:
         return BotStatus.STOPPED
 
 
-def stream_logs(container_id: str) -> Generator[str, None, None]:
+def stream_logs(container_id: str) -> Generator[bytes, None, None]:
     """
     Stream logs from a container.
-    Returns a generator that yields log lines.
+    Returns a generator that yields raw log chunks as bytes; consumers pass
+    them straight to the socket, so log data never pays a per-chunk
+    decode/encode round-trip in Python.
     
     Security: Read-only access to logs, no execution capability.
     """
     client = get_docker_client()
     try:
-        container = client.containers.get(container_id)
-        for log_line in container.logs(stream=True, follow=True):
-            yield log_line.decode('utf-8', errors='replace')
+        # Low-level API reads from the daemon socket directly, skipping the
+        # per-call container inspect the high-level wrapper performs
+        for chunk in client.api.logs(
+            container_id, stream=True, follow=True, stdout=True, stderr=True
+        ):
+            yield chunk
     except NotFound:
         logger.error(f"Container {container_id} not found")
-        yield "Container not found"
+        yield b"Container not found"
     except APIError as e:
         logger.error(f"Failed to stream logs for container {container_id}: {e}")
-        yield f"Error streaming logs: {str(e)}"
+        yield f"Error streaming logs: {str(e)}".encode()
+
+
+def open_log_stream(container_id: str):
+    """
+    Open a raw follow-mode log stream for a container.
+
+    Returns docker-py's CancellableStream: iterate it for bytes chunks, and
+    call .close() from any thread to abort a blocked read. Callers that pump
+    the stream from a worker thread must close it when the consumer goes
+    away, otherwise the thread stays parked on the socket forever.
+    """
+    client = get_docker_client()
+    return client.api.logs(
+        container_id, stream=True, follow=True, stdout=True, stderr=True
+    )
 
 
 def get_recent_logs(container_id: str, tail: int = 100) -> str:
@@ -3,24 +3,29 @@ Main FastAPI application for the bot hosting platform.
 Configures routes, middleware, and application lifecycle.
 """
 
-from fastapi import FastAPI, Request, Depends, status, HTTPException
+from fastapi import FastAPI, Request, Depends, Query, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, ORJSONResponse
+from cachetools import TTLCache
+from sqlalchemy import bindparam, func, lambda_stmt, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field, EmailStr
-from datetime import timedelta
+from datetime import datetime, timedelta
 from typing import List
+import asyncio
 import logging
 import os
 
 from app.db import get_db, init_db
 from app.models import User, UserRole, UserStatus, Plan, AuditLog
 from app.auth import (
-    hash_password, verify_password, create_access_token,
-    get_current_user, get_admin_user
+    ahash_password, averify_password_cached, adummy_verify,
+    create_access_token, get_current_user, get_admin_user,
+    check_crypto_backend
 )
-from app.utils import validate_email, get_client_ip, rate_limit, BadRequestException, ConflictException
-from app.bots import router as bots_router, create_audit_log
+from app.utils import get_client_ip, rate_limit, BadRequestException, ConflictException
+from app.bots import router as bots_router, create_audit_log, audit_log_writer
 from app.sockets import router as ws_router
 
 # Configure logging
@@ -36,7 +41,8 @@ app = FastAPI(
     description="Multi-user bot hosting platform with Docker container management",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -70,7 +76,7 @@ class UserResponse(BaseModel):
     email: str
     role: UserRole
     status: UserStatus
-    created_at: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
@@ -81,6 +87,14 @@ class UserListResponse(BaseModel):
     total: int
 
 
+# Login runs on every token issuance; a lambda statement skips Python-side
+# statement construction on each call (the compiled SQL is already cached by
+# SQLAlchemy's execution cache)
+_LOGIN_USER_STMT = lambda_stmt(
+    lambda: select(User).where(User.email == bindparam("email"))
+)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -92,44 +106,40 @@ async def startup_event():
     logger.info("=" * 70)
     
     try:
+        # Warn if the SHA-256 hot path isn't hardware-accelerated
+        check_crypto_backend()
+
         # Initialize database tables
         init_db()
         logger.info("✓ Database initialized successfully")
         
-        # Create default plans if they don't exist
+        # Seed default plans with one idempotent INSERT: the unique name
+        # constraint makes re-runs no-ops, so there's no COUNT round-trip
+        # and no read-then-write race across workers starting together
         from app.db import get_db_context
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
         with get_db_context() as db:
-            # Check if plans exist
-            plan_count = db.query(Plan).count()
-            if plan_count == 0:
-                # Create default plans
-                default_plans = [
-                    Plan(
-                        name="Free",
-                        max_bots=1,
-                        cpu_limit="0.5",
-                        ram_limit="256m"
-                    ),
-                    Plan(
-                        name="Basic",
-                        max_bots=3,
-                        cpu_limit="1.0",
-                        ram_limit="512m"
-                    ),
-                    Plan(
-                        name="Pro",
-                        max_bots=10,
-                        cpu_limit="2.0",
-                        ram_limit="1g"
-                    ),
-                ]
-                for plan in default_plans:
-                    db.add(plan)
-                db.commit()
-                logger.info("✓ Default plans created (Free, Basic, Pro)")
-            else:
-                logger.info(f"✓ Found {plan_count} existing plan(s)")
+            stmt = pg_insert(Plan).values([
+                {"name": "Free", "max_bots": 1, "cpu_limit": "0.5", "ram_limit": "256m"},
+                {"name": "Basic", "max_bots": 3, "cpu_limit": "1.0", "ram_limit": "512m"},
+                {"name": "Pro", "max_bots": 10, "cpu_limit": "2.0", "ram_limit": "1g"},
+            ]).on_conflict_do_nothing(index_elements=["name"])
+            db.execute(stmt)
+            db.commit()
+        logger.info("✓ Default plans ensured (Free, Basic, Pro)")
         
+        # Start the batched audit-log writer
+        app.state.audit_writer = asyncio.create_task(audit_log_writer())
+        logger.info("✓ Audit log writer started")
+
+        # Warm the image cache in the background; startup doesn't wait on
+        # multi-second pulls and the first bot creation per runtime skips them
+        from app.docker import prepull_runtime_images
+        app.state.image_prepull = asyncio.create_task(
+            asyncio.to_thread(prepull_runtime_images)
+        )
+        logger.info("✓ Runtime image pre-pull scheduled")
+
         # Log startup info
         port = int(os.getenv("PORT", "8000"))
         host = os.getenv("HOST", "0.0.0.0")
@@ -154,6 +164,11 @@ async def shutdown_event():
     logger.info("👋 Shutting down Sapine Bot Hosting API...")
     logger.info("=" * 70)
 
+    # Stop the audit-log writer
+    writer = getattr(app.state, "audit_writer", None)
+    if writer:
+        writer.cancel()
+
 
 # Root endpoint
 @app.get("/")
@@ -239,7 +254,7 @@ async def health_check():
 async def register(
     user_data: RegisterRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Register a new user account.
@@ -259,29 +274,28 @@ async def register(
     }
     ```
     """
-    # Validate email format
-    if not validate_email(user_data.email):
-        raise BadRequestException("Invalid email format. Please provide a valid email address.")
-    
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise ConflictException("This email is already registered. Please login or use a different email.")
+    # Email format is already enforced by the EmailStr field at
+    # deserialization time (email-validator, C-accelerated in Pydantic v2)
     
-    # Create user
+    # Create user; the unique constraint on email is the duplicate check,
+    # which saves a SELECT round-trip and closes the lookup/insert race
     user = User(
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await ahash_password(user_data.password),
         role=UserRole.USER,
         status=UserStatus.ACTIVE
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise ConflictException("This email is already registered. Please login or use a different email.")
+    await db.refresh(user)
     
     # Create audit log
     create_audit_log(
-        db, user.id, "user_register", str(user.id),
+        user.id, "user_register", str(user.id),
         get_client_ip(request)
     )
     
@@ -298,7 +312,7 @@ async def register(
 async def login(
     credentials: LoginRequest,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login with email and password.
@@ -319,15 +333,17 @@ async def login(
     - 403: Account suspended
     """
     # Find user
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(_LOGIN_USER_STMT, {"email": credentials.email})
     if not user:
+        # Burn a verification so unknown emails cost the same as known ones
+        await adummy_verify(credentials.email, credentials.password)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password. Please check your credentials and try again."
         )
     
-    # Verify password
-    if not verify_password(credentials.password, user.password_hash):
+    # Verify password (cached briefly to absorb bursty retries)
+    if not await averify_password_cached(user.id, credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password. Please check your credentials and try again."
@@ -342,7 +358,7 @@ async def login(
     
     # Create audit log
     create_audit_log(
-        db, user.id, "user_login", str(user.id),
+        user.id, "user_login", str(user.id),
         get_client_ip(request)
     )
     
@@ -359,38 +375,42 @@ async def get_me(current_user: User = Depends(get_current_user)):
     """
     Get current authenticated user information.
     """
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        role=current_user.role,
-        status=current_user.status,
-        created_at=current_user.created_at.isoformat()
-    )
+    return UserResponse.model_validate(current_user)
 
 
 # Admin endpoints
+
+# Total-user COUNT dominates pagination on large tables; amortize it across
+# page loads with a short TTL
+_user_count_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+
+
 @app.get("/admin/users", response_model=UserListResponse)
 async def list_users(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    List all users (ADMIN and OWNER only).
+    List users (ADMIN and OWNER only), paginated.
+    `total` reflects the whole table and may lag by up to 30 seconds.
     """
-    users = db.query(User).all()
+    result = await db.execute(
+        select(User).order_by(User.id).limit(limit).offset(offset)
+    )
+    users = result.scalars().all()
+
+    total = _user_count_cache.get("user_count")
+    if total is None:
+        total = await db.scalar(select(func.count(User.id)))
+        _user_count_cache["user_count"] = total
     
+    # model_validate + a datetime field keeps serialization in Pydantic's
+    # C-accelerated path instead of per-row Python kwargs and isoformat()
     return UserListResponse(
-        users=[
-            UserResponse(
-                id=user.id,
-                email=user.email,
-                role=user.role,
-                status=user.status,
-                created_at=user.created_at.isoformat()
-            )
-            for user in users
-        ],
-        total=len(users)
+        users=[UserResponse.model_validate(user) for user in users],
+        total=total
     )
 
 
@@ -400,14 +420,15 @@ async def suspend_user(
     user_id: int,
     request: Request,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Suspend a user account (ADMIN and OWNER only).
     
     Suspended users cannot login or use the platform.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # Identity-map-aware primary-key fast path
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -419,11 +440,11 @@ async def suspend_user(
         )
     
     user.status = UserStatus.SUSPENDED
-    db.commit()
+    await db.commit()
     
     # Create audit log
     create_audit_log(
-        db, current_user.id, "user_suspend", str(user_id),
+        current_user.id, "user_suspend", str(user_id),
         get_client_ip(request),
         f"Suspended by {current_user.email}"
     )
@@ -439,21 +460,21 @@ async def activate_user(
     user_id: int,
     request: Request,
     current_user: User = Depends(get_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Activate a suspended user account (ADMIN and OWNER only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     user.status = UserStatus.ACTIVE
-    db.commit()
+    await db.commit()
     
     # Create audit log
     create_audit_log(
-        db, current_user.id, "user_activate", str(user_id),
+        current_user.id, "user_activate", str(user_id),
         get_client_ip(request),
         f"Activated by {current_user.email}"
     )
@@ -3,9 +3,9 @@ Database models for the bot hosting platform.
 Defines User, Plan, Bot, and AuditLog tables with proper relationships.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
+from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from datetime import datetime
 import enum
 from app.db import Base
 
@@ -55,7 +55,7 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     role = Column(SQLEnum(UserRole), default=UserRole.USER, nullable=False)
     status = Column(SQLEnum(UserStatus), default=UserStatus.ACTIVE, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relationships
     bots = relationship("Bot", back_populates="user", cascade="all, delete-orphan")
@@ -87,6 +87,13 @@ class Bot(Base):
     Security: container_id is INTERNAL ONLY and never exposed via API.
     """
     __tablename__ = "bots"
+    __table_args__ = (
+        # Bot names are unique per user; backs the duplicate-name check and
+        # the per-user lookups in create_bot/verify_bot_ownership
+        Index("ix_bot_user_name", "user_id", "name", unique=True),
+        # Dashboard queries filter by owner and status together
+        Index("ix_bots_user_status", "user_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -100,7 +107,7 @@ class Bot(Base):
     status = Column(SQLEnum(BotStatus), default=BotStatus.CREATED, nullable=False)
     start_cmd = Column(String(500), nullable=True)  # User-provided start command (validated)
     source_type = Column(SQLEnum(SourceType), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="bots")
@@ -113,6 +120,11 @@ class AuditLog(Base):
     Used for compliance and security monitoring.
     """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # BRIN suits this table: rows are append-only so created_at is
+        # physically ordered, and the index stays ~100x smaller than a btree
+        Index("ix_audit_created_brin", "created_at", postgresql_using="brin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
@@ -120,7 +132,7 @@ class AuditLog(Base):
     target_id = Column(String(100), nullable=True)  # ID of affected resource (bot_id, user_id, etc.)
     ip_address = Column(String(50), nullable=True)
     details = Column(Text, nullable=True)  # Additional context as JSON string
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="audit_logs")
@@ -4,26 +4,50 @@ Provides read-only access to container logs.
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from sqlalchemy.orm import Session
-from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
+from jwt import PyJWTError
+from cachetools import TTLCache
+from collections import deque
 import logging
 import asyncio
+import threading
 
 from app.db import get_db
 from app.models import Bot, User
 from app.auth import decode_token
-from app.docker import stream_logs, get_recent_logs
+from app.docker import open_log_stream, get_recent_logs
 from app.bots import verify_bot_ownership
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["websockets"])
 
+# Reader thread pauses once this many log chunks are waiting to be sent
+_PENDING_MAX = 256
 
-async def get_current_user_ws(token: str, db: Session) -> User:
+# Target size for a coalesced log frame; big enough to amortize frame
+# headers and sendmsg calls, small enough to keep frames from monopolizing
+# the connection
+_FRAME_BUDGET = 64 * 1024  # bytes
+
+# Cap on the recent-logs preamble sent before the live stream
+_RECENT_LOGS_CAP = 64_000  # bytes
+
+# Recently-authenticated websocket users; reconnect bursts skip the user
+# query. Downstream only consumes existence and .id, so a short window is
+# safe — account changes take effect on the next miss.
+_ws_user_cache: TTLCache = TTLCache(maxsize=4096, ttl=60)
+
+
+async def get_current_user_ws(token: str, db: AsyncSession) -> User:
     """
     Authenticate WebSocket connection using JWT token.
     """
+    # Cheap structural gate: a JWT is three base64url segments. Garbage or
+    # oversized tokens from hostile connects never reach the crypto path.
+    if not token or len(token) > 4096 or token.count(".") != 2:
+        return None
+
     try:
         payload = decode_token(token)
         user_id_str = payload.get("sub")
@@ -36,9 +60,15 @@ async def get_current_user_ws(token: str, db: Session) -> User:
             logger.warning(f"Invalid user ID format in WebSocket token: {user_id_str}")
             return None
         
-        user = db.query(User).filter(User.id == user_id).first()
+        # decode_token above already serves repeat tokens from its cache;
+        # this keeps reconnect bursts from re-querying the user row too
+        user = _ws_user_cache.get(user_id)
+        if user is None:
+            user = await db.get(User, user_id)
+            if user is not None:
+                _ws_user_cache[user_id] = user
         return user
-    except JWTError:
+    except PyJWTError:
         return None
 
 
@@ -47,7 +77,7 @@ async def bot_logs_websocket(
     websocket: WebSocket,
     bot_id: int,
     token: str = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     WebSocket endpoint for streaming bot logs in real-time.
@@ -73,7 +103,7 @@ async def bot_logs_websocket(
         
         # Verify bot ownership
         try:
-            bot = verify_bot_ownership(bot_id, user.id, db)
+            bot = await verify_bot_ownership(bot_id, user.id, db)
         except Exception as e:
             await websocket.send_text(f"Authorization failed: {str(e)}")
             await websocket.close(code=1008)
@@ -86,23 +116,91 @@ async def bot_logs_websocket(
         
         logger.info(f"User {user.id} connected to logs for bot {bot_id}")
         
-        # Send recent logs first
-        recent_logs = get_recent_logs(bot.container_id, tail=50)
+        # Send recent logs first (off-loop; the docker call blocks), capped
+        # so a container that prints huge tracebacks can't front-load the
+        # socket with hundreds of KB before the live stream starts
+        recent_logs = await asyncio.to_thread(get_recent_logs, bot.container_id, 50)
+        if len(recent_logs) > _RECENT_LOGS_CAP:
+            recent_logs = recent_logs[-_RECENT_LOGS_CAP:]
         if recent_logs:
             await websocket.send_text(f"=== Recent Logs ===\n{recent_logs}\n=== Live Stream ===\n")
         
-        # Stream logs in real-time
+        # Stream logs in real-time. A worker thread reads the blocking
+        # docker stream into a deque and wakes the sender with a Future —
+        # one loop callback per burst rather than one queue handoff per
+        # chunk. The sender drains the whole deque into a single frame, and
+        # the reader pauses whenever too much is pending (backpressure for
+        # slow clients).
         async def stream_to_websocket():
+            loop = asyncio.get_running_loop()
+            pending: "deque[bytes]" = deque()
+            space = threading.Event()  # cleared while the sender is behind
+            space.set()
+            wakeup: asyncio.Future = loop.create_future()
+            done = False
+            stopped = False  # set by the sender so a paused reader exits
+
+            def notify():
+                if not wakeup.done():
+                    wakeup.set_result(None)
+
+            def pump():
+                nonlocal done
+                try:
+                    for chunk in log_stream:
+                        space.wait()
+                        if stopped:
+                            break
+                        pending.append(chunk)
+                        if len(pending) >= _PENDING_MAX:
+                            space.clear()
+                        loop.call_soon_threadsafe(notify)
+                except Exception as e:
+                    # A stream closed mid-read (client disconnect) lands here
+                    logger.debug(f"Log stream for bot {bot_id} ended: {e}")
+                finally:
+                    done = True
+                    loop.call_soon_threadsafe(notify)
+
+            threading.Thread(target=pump, daemon=True).start()
+
             try:
-                for log_line in stream_logs(bot.container_id):
-                    await websocket.send_text(log_line)
-                    await asyncio.sleep(0.01)  # Small delay to prevent overwhelming
+                while True:
+                    await wakeup
+                    wakeup = loop.create_future()
+                    while pending:
+                        # Drain up to the frame budget per send; a backlog
+                        # becomes a few bounded frames, not one huge one
+                        buf = [pending.popleft()]
+                        size = len(buf[0])
+                        while pending and size < _FRAME_BUDGET:
+                            chunk = pending.popleft()
+                            buf.append(chunk)
+                            size += len(chunk)
+                        if len(pending) < _PENDING_MAX:
+                            space.set()
+                        await websocket.send_bytes(b"".join(buf))
+                    if done:
+                        break
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"Error streaming logs: {e}")
                 await websocket.send_text(f"Error: {str(e)}")
+            finally:
+                # Release a reader parked in space.wait() (client went away
+                # while the backlog was full) so it can observe the stop
+                # flag and exit instead of leaking
+                stopped = True
+                space.set()
         
-        # Start streaming
-        await stream_to_websocket()
+        # Start streaming; close the docker stream on the way out so the
+        # reader thread's blocked read aborts instead of leaking
+        log_stream = open_log_stream(bot.container_id)
+        try:
+            await stream_to_websocket()
+        finally:
+            log_stream.close()
         
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for bot {bot_id}")
@@ -5,14 +5,147 @@ Utility functions including validation, error handling, and helpers.
 from fastapi import HTTPException, Request, status
 from functools import wraps
 from typing import Optional
+import logging
 import re
 import time
-from collections import defaultdict
+from collections import deque
 import os
+import string
 
+from cachetools import LRUCache
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 
-# Rate limiting storage (in production, use Redis)
-rate_limit_storage = defaultdict(list)
+logger = logging.getLogger(__name__)
+
+# Redis-backed rate limiting (shared across workers). Falls back to the
+# in-process storage below when REDIS_URL is unset or Redis is unreachable.
+REDIS_URL = os.getenv("REDIS_URL")
+_redis_client: Optional[aioredis.Redis] = None
+_redis_down_until = 0.0  # Circuit breaker: skip Redis briefly after a failure
+_REDIS_RETRY_SECONDS = 30
+
+# In-process fallback storage (per-worker limits only); deques give O(1)
+# expiry pops, and the LRU cap keeps a botnet scan or spoofed
+# X-Forwarded-For flood from growing the dict without bound
+rate_limit_storage: LRUCache = LRUCache(maxsize=100_000)
+_RATE_SWEEP_INTERVAL = 60  # seconds between stale-IP sweeps
+_rate_last_sweep = 0.0
+
+
+def _sweep_rate_storage(current_time: float):
+    """
+    Drop (scope, IP) entries whose whole window has expired, at most once
+    per interval.
+    Keeps the fallback dict bounded by recently-active clients instead of
+    growing with every IP ever seen.
+    """
+    global _rate_last_sweep
+    if current_time - _rate_last_sweep < _RATE_SWEEP_INTERVAL:
+        return
+    _rate_last_sweep = current_time
+    stale = [
+        key for key, window in list(rate_limit_storage.items())
+        if not window or current_time - window[-1] >= 60
+    ]
+    for key in stale:
+        del rate_limit_storage[key]
+
+
+def _get_redis() -> Optional[aioredis.Redis]:
+    """
+    Lazily create the shared Redis client, or None if Redis isn't configured.
+    """
+    global _redis_client
+    if _redis_client is None and REDIS_URL:
+        _redis_client = aioredis.Redis.from_url(REDIS_URL)
+    return _redis_client
+
+
+async def _check_rate_limit(scope: str, client_ip: str, requests_per_minute: int):
+    """
+    Enforce a per-IP fixed-window limit, preferring Redis (atomic INCR+EXPIRE
+    in one pipelined round-trip, correct across workers) and falling back to
+    the in-process storage when Redis is down or unconfigured.
+    Raises HTTPException 429 when the limit is exceeded.
+    """
+    global _redis_down_until
+    current_time = time.time()
+
+    client = _get_redis()
+    if client is not None and current_time >= _redis_down_until:
+        key = f"rl:{scope}:{client_ip}:{int(current_time // 60)}"
+        try:
+            pipe = client.pipeline()
+            pipe.incr(key)
+            pipe.expire(key, 60)
+            count, _ = await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning(f"Rate limiter falling back to in-process storage: {e}")
+            _redis_down_until = current_time + _REDIS_RETRY_SECONDS
+        else:
+            if count > requests_per_minute:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many requests. Please try again later."
+                )
+            return
+
+    # In-process fallback: expire from the left in O(1) per stale entry.
+    # Keyed per scope like the Redis path, so one endpoint's traffic can't
+    # consume another's budget.
+    _sweep_rate_storage(current_time)
+    storage_key = (scope, client_ip)
+    window = rate_limit_storage.get(storage_key)
+    if window is None:
+        window = rate_limit_storage[storage_key] = deque()
+    while window and current_time - window[0] >= 60:
+        window.popleft()
+
+    if len(window) >= requests_per_minute:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later."
+        )
+
+    window.append(current_time)
+
+
+# Validators below run on every create/upload (and once per zip member on
+# uploads), so their patterns are compiled once at import and the bound
+# search/fullmatch/sub methods are kept as module-level callables.
+
+# Dangerous patterns that could allow shell injection. Every pattern is a
+# fixed literal, so plain substring checks (C-level memmem over one lowered
+# copy) beat the regex engine — no alternation, no backtracking. The old
+# curl/wget pipe patterns are subsumed by "|" being blocked outright:
+# shell operators (&&, ||, ;, |, >, <), command substitution (`, $()),
+# shell/binary execution, and destructive commands.
+_DANGEROUS_LITERALS = (
+    "&&", "||", ";", "|", ">", "<", "`", "$(",
+    "bash", "sh ", "/bin/", "rm ", "dd ", "mkfs",
+)
+
+# Both validators accept strict ASCII character classes, so frozenset
+# membership (C-level issuperset) replaces the regex engine on these hot
+# signup/create paths
+_EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "._%+-")
+_EMAIL_DOMAIN_CHARS = frozenset(string.ascii_letters + string.digits + ".-")
+
+_BOT_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+
+_UNSAFE_FILENAME_SUB = re.compile(r"[^a-zA-Z0-9._-]").sub
+
+# Single-pass sanitizer table: every ASCII character outside the whitelist
+# maps to "_" in one C-level translate. Non-ASCII input (rare) falls back to
+# the regex sub above.
+_SAFE_FILENAME_CHARS = frozenset(string.ascii_letters + string.digits + "._-")
+_SANITIZE_TABLE = str.maketrans(
+    {c: "_" for c in map(chr, range(256)) if c not in _SAFE_FILENAME_CHARS}
+)
+
+# Collapses the underscore runs the whitelist pass leaves behind
+_UNDERSCORE_RUNS = re.compile(r"_+").sub
 
 
 def validate_start_command(command: str) -> bool:
@@ -28,40 +161,26 @@ def validate_start_command(command: str) -> bool:
     """
     if not command or len(command) > 500:
         return False
-    
-    # Dangerous patterns that could allow shell injection
-    dangerous_patterns = [
-        r'&&',      # Command chaining
-        r'\|\|',    # Or operator
-        r';',       # Command separator
-        r'\|',      # Pipe
-        r'>',       # Redirect output
-        r'<',       # Redirect input
-        r'`',       # Command substitution
-        r'\$\(',    # Command substitution
-        r'bash',    # Shell execution
-        r'sh ',     # Shell execution
-        r'/bin/',   # Direct binary execution
-        r'rm ',     # File deletion
-        r'dd ',     # Disk operations
-        r'mkfs',    # Format filesystem
-        r'curl.*\|', # Pipe from curl
-        r'wget.*\|', # Pipe from wget
-    ]
-    
-    for pattern in dangerous_patterns:
-        if re.search(pattern, command, re.IGNORECASE):
-            return False
-    
-    return True
+    lowered = command.lower()
+    return not any(literal in lowered for literal in _DANGEROUS_LITERALS)
 
 
 def validate_email(email: str) -> bool:
     """
     Validate email format.
     """
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    # RFC 5321 caps addresses at 254 octets; gating up front also bounds
+    # the scan cost on hostile input
+    if not email or len(email) > 254:
+        return False
+    local, sep, domain = email.partition("@")
+    if not sep or not local or not _EMAIL_LOCAL_CHARS.issuperset(local):
+        return False
+    if not domain or not _EMAIL_DOMAIN_CHARS.issuperset(domain):
+        return False
+    # Domain needs a dot and an alphabetic TLD of at least two characters
+    head, dot, tld = domain.rpartition(".")
+    return bool(dot) and bool(head) and len(tld) >= 2 and tld.isalpha()
 
 
 def validate_bot_name(name: str) -> bool:
@@ -69,8 +188,7 @@ def validate_bot_name(name: str) -> bool:
     Validate bot name.
     Must be alphanumeric with hyphens/underscores, 3-50 characters.
     """
-    pattern = r'^[a-zA-Z0-9_-]{3,50}$'
-    return bool(re.match(pattern, name))
+    return 3 <= len(name) <= 50 and _BOT_NAME_CHARS.issuperset(name)
 
 
 def sanitize_filename(filename: str) -> str:
@@ -79,29 +197,42 @@ def sanitize_filename(filename: str) -> str:
     Removes any path components and dangerous characters.
     """
     # Get basename to remove any path components
-    filename = os.path.basename(filename)
-    
-    # Remove any remaining path traversal attempts
-    filename = filename.replace("..", "").replace("/", "").replace("\\", "")
-    
-    # Keep only safe characters
-    filename = re.sub(r'[^a-zA-Z0-9._-]', '_', filename)
+    original = os.path.basename(filename)
+
+    # One scan replaces every unsafe character, slashes included
+    if original.isascii():
+        filename = original.translate(_SANITIZE_TABLE)
+    else:
+        filename = _UNSAFE_FILENAME_SUB('_', original)
+
+    # ".." is built from whitelisted characters, so strip traversal
+    # fragments explicitly (cheap containment test first)
+    if ".." in filename:
+        filename = filename.replace("..", "")
+
+    # Collapse underscore runs only when the whitelist pass actually
+    # substituted something; names that were already clean — __init__.py,
+    # my__module.py — keep their underscores verbatim
+    if filename != original and "__" in filename:
+        filename = _UNDERSCORE_RUNS("_", filename)
     
     # Limit length
     if len(filename) > 255:
         name, ext = os.path.splitext(filename)
         filename = name[:250] + ext
     
+    # A degenerate result would resolve to the upload directory itself
+    if filename in ("", ".", "_"):
+        filename = "upload"
+    
     return filename
 
 
 def rate_limit(requests_per_minute: int = 60):
     """
-    Simple rate limiting decorator.
-    In production, use Redis for distributed rate limiting.
-    
-    Note: This in-memory implementation automatically cleans old entries on each request.
-    For high-traffic production use, implement Redis-based rate limiting.
+    Rate limiting decorator.
+    Uses Redis (atomic, shared across workers) when REDIS_URL is configured,
+    with an automatic in-process fallback when Redis is unavailable.
     """
     def decorator(func):
         @wraps(func)
@@ -114,29 +245,12 @@ def rate_limit(requests_per_minute: int = 60):
                     if isinstance(arg, Request):
                         request = arg
                         break
-            
+
             if request:
                 # Get client IP
                 client_ip = request.client.host if request.client else "unknown"
-                current_time = time.time()
-                
-                # Clean old entries (removes entries older than 60 seconds)
-                # This prevents unbounded memory growth
-                rate_limit_storage[client_ip] = [
-                    t for t in rate_limit_storage[client_ip]
-                    if current_time - t < 60
-                ]
-                
-                # Check rate limit
-                if len(rate_limit_storage[client_ip]) >= requests_per_minute:
-                    raise HTTPException(
-                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                        detail="Too many requests. Please try again later."
-                    )
-                
-                # Add current request
-                rate_limit_storage[client_ip].append(current_time)
-            
+                await _check_rate_limit(func.__name__, client_ip, requests_per_minute)
+
             return await func(*args, **kwargs)
         return wrapper
     return decorator
@@ -149,7 +263,9 @@ def get_client_ip(request: Request) -> str:
     """
     forwarded = request.headers.get("X-Forwarded-For")
     if forwarded:
-        return forwarded.split(",")[0].strip()
+        # Only the first hop matters; partition stops at the first comma
+        # without building a list for long proxy chains
+        return forwarded.partition(",")[0].strip()
     return request.client.host if request.client else "unknown"
 
 